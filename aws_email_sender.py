@@ -4,26 +4,233 @@ AWS SES Email Sender
 Sends emails using AWS Simple Email Service (SES) via boto3
 """
 
-import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import (
+    BotoCoreError, ClientError, ConnectionClosedError, EndpointConnectionError, NoCredentialsError
+)
+import io
 import os
+import html
+import re
 import json
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+import logging
+import hmac
+import time
+import random
+import base64
+import hashlib
+import select
+import secrets
+import threading
+import functools
+import urllib.parse
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+# SES accepts at most 50 destinations per send call
+SES_MAX_DESTINATIONS = 50
+
+# Attempts per SES call, including the first, before a throttled send fails
+SES_MAX_RETRIES = 5
+
+# Seconds a get_send_quota result is reused before asking SES again
+SEND_QUOTA_TTL = 60
+
+# Seconds to wait before retrying a failed MaxSendRate lookup
+SEND_QUOTA_RETRY_DELAY = 5
+
+# Region the script sends through when run directly
+AWS_REGION = 'us-east-1'  # Change to your preferred region
+
+class _SendRateLimiter:
+    """
+    Token bucket holding a region's SES send rate, shared by all its senders
+    """
+    __slots__ = ('rate', 'tokens', 'last_refill', 'next_lookup', 'lock')
+
+    def __init__(self):
+        self.rate = None
+        self.tokens = 0.0
+        self.last_refill = 0.0
+        self.next_lookup = 0.0
+        self.lock = threading.Lock()
+    
+    def acquire(self, count, get_send_quota):
+        """
+        Block until the send rate allows count more recipients
+        
+        The rate is read from get_send_quota on first use. If that fails the
+        send goes ahead unlimited and the lookup is retried after
+        SEND_QUOTA_RETRY_DELAY seconds.
+        
+        Args:
+            count (int): Number of recipients in the send
+            get_send_quota (callable): Returns the quota dict, or None on error
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.rate is None:
+                if now < self.next_lookup:
+                    return
+                quota_info = get_send_quota()
+                if not quota_info:
+                    self.next_lookup = now + SEND_QUOTA_RETRY_DELAY
+                    return
+                self.rate = float(quota_info['MaxSendRate'])
+                self.tokens = self.rate
+                self.last_refill = now
+            
+            rate = self.rate
+            if rate <= 0:
+                return
+            
+            self.tokens = min(rate, self.tokens + (now - self.last_refill) * rate)
+            self.last_refill = now
+            
+            if self.tokens < count:
+                time.sleep((count - self.tokens) / rate)
+                self.tokens = float(count)
+                self.last_refill = time.monotonic()
+            self.tokens -= count
 
 class AWSEmailSender:
-    def __init__(self, region_name='us-east-1'):
+    # SES clients shared by all senders, keyed by region name. Building a
+    # client parses the botocore service model, so it is done once per region.
+    _client_cache = {}
+    _query_client_cache = {}
+    _session = None
+    
+    # boto3 sessions are not thread-safe, so creating the session and
+    # building clients from it is serialized; cached lookups skip the lock
+    _session_lock = threading.RLock()
+    
+    # MaxSendRate is an account limit per region, so every sender for a
+    # region draws from the same token bucket
+    _rate_limiters = {}
+    
+    __slots__ = (
+        'region_name', 'ses_client', 'raw_client', '_rate_limiter', '_quota_cache'
+    )
+
+    def __init__(self, region_name='us-east-1', use_query_api=False):
         """
         Initialize AWS SES client
         
         Args:
             region_name (str): AWS region name (default: us-east-1)
+            use_query_api (bool): Send raw emails through the lightweight
+                SigV4 query client instead of boto3 (default: False)
         """
         self.region_name = region_name
-        self.ses_client = boto3.client('ses', region_name=region_name)
+        self.ses_client = self._get_ses_client(region_name)
+        self.raw_client = self._get_query_client(region_name) if use_query_api else self.ses_client
+        
+        # Client-side token bucket, sized from MaxSendRate on the first send
+        self._rate_limiter = self._rate_limiters.get(region_name)
+        if self._rate_limiter is None:
+            self._rate_limiter = self._rate_limiters.setdefault(region_name, _SendRateLimiter())
+        
+        # (time.monotonic() of the fetch, get_send_quota response)
+        self._quota_cache = None
+
+    @classmethod
+    def _get_ses_client(cls, region_name):
+        """
+        Return the cached SES client for a region, creating it on first use
+        
+        Args:
+            region_name (str): AWS region name
+            
+        Returns:
+            botocore.client.SES: Shared SES client
+        """
+        client = cls._client_cache.get(region_name)
+        if client is not None:
+            return client
         
+        from botocore.config import Config
+        
+        with cls._session_lock:
+            client = cls._client_cache.get(region_name)
+            if client is None:
+                # Adaptive retries back off on throttling; a larger pool with
+                # TCP keep-alive lets concurrent sends reuse open TLS connections
+                config = Config(
+                    region_name=region_name,
+                    retries={'mode': 'adaptive', 'total_max_attempts': SES_MAX_RETRIES},
+                    max_pool_connections=50,
+                    tcp_keepalive=True,
+                    connect_timeout=3,
+                    read_timeout=10
+                )
+                client = cls._get_session().client('ses', region_name=region_name, config=config)
+                cls._client_cache[region_name] = client
+        return client
+    
+    @classmethod
+    def _get_query_client(cls, region_name):
+        """
+        Return the cached SigV4 query client for a region
+        
+        A client is only cached once it has been built with credentials, so
+        configuring credentials later in the process takes effect.
+        
+        Args:
+            region_name (str): AWS region name
+            
+        Returns:
+            SESQueryClient: Shared query client
+            
+        Raises:
+            NoCredentialsError: If no credentials are configured
+        """
+        client = cls._query_client_cache.get(region_name)
+        if client is not None:
+            return client
+        
+        with cls._session_lock:
+            client = cls._query_client_cache.get(region_name)
+            if client is None:
+                client = SESQueryClient(region_name, cls._get_session().get_credentials())
+                cls._query_client_cache[region_name] = client
+        return client
+    
+    @staticmethod
+    def _get_session():
+        """
+        Return the boto3 session shared by all senders
+        
+        A single session means credentials are resolved only once. Callers
+        that build clients from it should hold _session_lock.
+        
+        Returns:
+            boto3.session.Session: Shared session
+        """
+        if AWSEmailSender._session is None:
+            with AWSEmailSender._session_lock:
+                if AWSEmailSender._session is None:
+                    # boto3 is imported on first use to keep module import cheap
+                    import boto3
+                    AWSEmailSender._session = boto3.session.Session()
+        return AWSEmailSender._session
+    
+    def _wait_for_send_slot(self, count=1):
+        """
+        Block until the account's SES send rate allows another send
+        
+        SES counts every recipient against MaxSendRate, so a send to several
+        addresses takes several tokens. The bucket is shared by all senders
+        for the region.
+        
+        Args:
+            count (int): Number of recipients in the send (default: 1)
+        """
+        self._rate_limiter.acquire(count, self.get_send_quota)
+    
     def send_email(self, sender_email, recipient_emails, subject, html_content, text_content=None, cc_emails=None, bcc_emails=None):
         """
         Send email using AWS SES
@@ -73,6 +280,7 @@ class AWSEmailSender:
                 }
             
             # Send email
+            self._wait_for_send_slot(len(recipient_emails) + len(cc_emails or []) + len(bcc_emails or []))
             response = self.ses_client.send_email(
                 Source=sender_email,
                 Destination=destination,
@@ -81,13 +289,18 @@ class AWSEmailSender:
             
             return response
             
-        except ClientError as e:
-            print(f"Error sending email: {e}")
+        except (ClientError, BotoCoreError) as e:
+            log.warning("Error sending email: %s", e)
             return None
     
-    def send_raw_email(self, sender_email, recipient_emails, subject, html_content, text_content=None):
+    def send_raw_email(self, sender_email, recipient_emails, subject, html_content, text_content=None, attachments=None):
         """
-        Send raw email using AWS SES (useful for complex HTML emails)
+        Send raw email using AWS SES (useful for emails with attachments)
+        
+        Without attachments SES can build the MIME message itself, so the
+        email is sent through send_email and no local MIME encoding is done,
+        unless the sender was created with use_query_api=True, in which case
+        the raw message goes through the SigV4 query client.
         
         Args:
             sender_email (str): Verified sender email address
@@ -95,39 +308,187 @@ class AWSEmailSender:
             subject (str): Email subject
             html_content (str): HTML content of the email
             text_content (str, optional): Plain text content of the email
+            attachments (list, optional): List of (filename, data, content_type)
+                tuples, where data is bytes
             
         Returns:
             dict: Response from AWS SES
         """
-        try:
-            # Create MIME message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = sender_email
-            msg['To'] = ', '.join(recipient_emails)
-            
-            # Add text content if provided
-            if text_content:
-                text_part = MIMEText(text_content, 'plain', 'utf-8')
-                msg.attach(text_part)
+        if not attachments and self.raw_client is self.ses_client:
+            return self.send_email(sender_email, recipient_emails, subject, html_content, text_content)
+        
+        # The encoded subject and bodies are cached, so repeated sends of the
+        # same content only assemble headers around them.
+        prepared = _prepare_message(subject, html_content, text_content)
+        return self.send_prepared(sender_email, recipient_emails, prepared, attachments)
+    
+    def send_prepared(self, sender_email, recipient_emails, prepared, attachments=None, destinations=None):
+        """
+        Send a raw email whose subject and bodies were encoded in advance
+        
+        Args:
+            sender_email (str): Verified sender email address
+            recipient_emails (list): List of addresses for the To: header
+            prepared (PreparedMessage): Pre-encoded message content
+            attachments (list, optional): List of (filename, data, content_type)
+                tuples, where data is bytes
+            destinations (list, optional): Addresses to deliver to, if they
+                differ from recipient_emails (e.g. blind copies)
             
-            # Add HTML content
-            html_part = MIMEText(html_content, 'html', 'utf-8')
-            msg.attach(html_part)
+        Returns:
+            dict: Response from AWS SES
+        """
+        if destinations is None:
+            destinations = recipient_emails
+        
+        try:
+            raw_message = _build_raw_message(sender_email, recipient_emails, prepared, attachments)
             
             # Send raw email
-            response = self.ses_client.send_raw_email(
+            self._wait_for_send_slot(len(destinations))
+            response = self.raw_client.send_raw_email(
                 Source=sender_email,
-                Destinations=recipient_emails,
-                RawMessage={'Data': msg.as_string()}
+                Destinations=destinations,
+                RawMessage={'Data': raw_message}
             )
             
             return response
             
-        except ClientError as e:
-            print(f"Error sending raw email: {e}")
+        except (ClientError, BotoCoreError) as e:
+            log.warning("Error sending raw email: %s", e)
             return None
     
+    def send_bcc_batch(self, sender_email, subject, html_content, text_content, bcc_emails, chunk_size=SES_MAX_DESTINATIONS):
+        """
+        Send the same email to many recipients as blind copies
+        
+        Use this instead of calling send_raw_email once per recipient: each
+        API call delivers to up to chunk_size addresses. The To: header is
+        the sender, so recipients never see each other, and every chunk
+        reuses the same prepared message bytes.
+        
+        Args:
+            sender_email (str): Verified sender email address
+            subject (str): Email subject
+            html_content (str): HTML content of the email
+            text_content (str, optional): Plain text content of the email
+            bcc_emails (list): List of recipient email addresses
+            chunk_size (int): Recipients per API call (default: 50, the SES maximum)
+            
+        Returns:
+            list: Response from AWS SES for each chunk (None if it failed)
+        """
+        prepared = _prepare_message(subject, html_content, text_content)
+        return [
+            self.send_prepared(sender_email, [sender_email], prepared,
+                               destinations=bcc_emails[start:start + chunk_size])
+            for start in range(0, len(bcc_emails), chunk_size)
+        ]
+    
+    def send_many(self, messages, max_workers=None):
+        """
+        Send several emails concurrently on a thread pool
+        
+        Each message is sent with send_raw_email, so plain text/HTML emails
+        go through send_email unless use_query_api is set. Sends are network
+        bound, so running them in parallel lets the account reach its SES
+        MaxSendRate instead of one email per round-trip.
+        
+        Args:
+            messages (list): List of dicts of send_raw_email keyword arguments
+            max_workers (int, optional): Number of concurrent sends
+                (default: the account's MaxSendRate, capped at the SES
+                client's connection pool size)
+            
+        Returns:
+            list: Response from AWS SES for each message, in input order
+                (None for messages that failed)
+        """
+        if max_workers is None:
+            quota_info = self.get_send_quota()
+            max_workers = max(1, int(quota_info['MaxSendRate'])) if quota_info else 1
+            # More threads than pooled connections only churns connections
+            max_workers = min(max_workers, self.ses_client.meta.config.max_pool_connections)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda message: self.send_raw_email(**message), messages))
+    
+    def create_or_update_template(self, template_name, subject, html_content, text_content=None):
+        """
+        Create an SES email template, or update it if it already exists
+        
+        Subject and bodies may use SES handlebars placeholders such as
+        {{name}}, filled in per recipient by send_bulk.
+        
+        Args:
+            template_name (str): Name of the SES template
+            subject (str): Subject part of the template
+            html_content (str): HTML part of the template
+            text_content (str, optional): Plain text part of the template
+            
+        Returns:
+            bool: True if the template was created or updated
+        """
+        template = {
+            'TemplateName': template_name,
+            'SubjectPart': subject,
+            'HtmlPart': html_content
+        }
+        if text_content:
+            template['TextPart'] = text_content
+        
+        try:
+            try:
+                self.ses_client.create_template(Template=template)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'AlreadyExists':
+                    raise
+                self.ses_client.update_template(Template=template)
+            return True
+        except ClientError as e:
+            log.warning("Error saving email template: %s", e)
+            return False
+    
+    def send_bulk(self, template_name, sender_email, destinations):
+        """
+        Send a templated email to many recipients using SendBulkTemplatedEmail
+        
+        Destinations are sent in chunks of SES_MAX_DESTINATIONS, so each API
+        call delivers up to 50 personalized emails.
+        
+        Args:
+            template_name (str): Name of an existing SES template
+            sender_email (str): Verified sender email address
+            destinations (list): List of dicts with an 'email' key and an
+                optional 'data' dict of template variables
+            
+        Returns:
+            list: Response from AWS SES for each chunk (None if it failed)
+        """
+        responses = []
+        for start in range(0, len(destinations), SES_MAX_DESTINATIONS):
+            chunk = destinations[start:start + SES_MAX_DESTINATIONS]
+            try:
+                self._wait_for_send_slot(len(chunk))
+                response = self.ses_client.send_bulk_templated_email(
+                    Source=sender_email,
+                    Template=template_name,
+                    DefaultTemplateData='{}',
+                    Destinations=[
+                        {
+                            'Destination': {'ToAddresses': [destination['email']]},
+                            'ReplacementTemplateData': json.dumps(destination.get('data') or {})
+                        }
+                        for destination in chunk
+                    ]
+                )
+                responses.append(response)
+            except (ClientError, BotoCoreError) as e:
+                log.warning("Error sending bulk email: %s", e)
+                responses.append(None)
+        
+        return responses
+    
     def verify_email_address(self, email_address):
         """
         Verify an email address with AWS SES
@@ -142,30 +503,618 @@ class AWSEmailSender:
             response = self.ses_client.verify_email_identity(
                 EmailAddress=email_address
             )
-            print(f"Verification email sent to {email_address}")
+            log.info("Verification email sent to %s", email_address)
             return True
         except ClientError as e:
-            print(f"Error verifying email address: {e}")
+            log.warning("Error verifying email address: %s", e)
             return False
     
-    def get_send_quota(self):
+    def get_send_quota(self, refresh=False):
         """
         Get current sending quota and rate from AWS SES
         
+        The result is reused for SEND_QUOTA_TTL seconds, so callers (and the
+        send rate limiter) can check it freely without an API call each time.
+        Counters such as SentLast24Hours may therefore be stale; pass
+        refresh=True when they need to be current.
+        
+        Args:
+            refresh (bool): Bypass the cached result (default: False)
+            
         Returns:
             dict: Quota information
         """
+        cached = self._quota_cache
+        if not refresh and cached is not None and time.monotonic() - cached[0] < SEND_QUOTA_TTL:
+            return cached[1]
+        
         try:
             response = self.ses_client.get_send_quota()
+            self._quota_cache = (time.monotonic(), response)
             return response
         except ClientError as e:
-            print(f"Error getting send quota: {e}")
+            log.warning("Error getting send quota: %s", e)
             return None
 
+class SESQueryClient:
+    """
+    Minimal SES client for SendRawEmail using the query API and SigV4
+    
+    Skips botocore's request pipeline: each send is one form-encoded POST
+    signed by hand over a kept-alive HTTPS connection (one per thread).
+    Responses mirror boto3's, and errors are raised as ClientError.
+    Throttling errors are retried with jittered exponential backoff, up to
+    SES_MAX_RETRIES attempts in total; other errors are not retried.
+    """
+    API_VERSION = '2010-12-01'
+    SERVICE = 'ses'
+
+    def __init__(self, region_name, credentials):
+        """
+        Initialize the query client
+        
+        Args:
+            region_name (str): AWS region name
+            credentials (botocore.credentials.Credentials): AWS credentials
+            
+        Raises:
+            NoCredentialsError: If no credentials are configured
+        """
+        if credentials is None:
+            raise NoCredentialsError()
+        
+        self.region_name = region_name
+        self.host = f'email.{region_name}.amazonaws.com'
+        self.credentials = credentials
+        self._local = threading.local()
+    
+    def send_raw_email(self, Source, Destinations, RawMessage):
+        """
+        Send a raw email, with the same arguments as boto3's send_raw_email
+        
+        Args:
+            Source (str): Verified sender email address
+            Destinations (list): List of recipient email addresses
+            RawMessage (dict): Dict with the raw MIME message under 'Data'
+            
+        Returns:
+            dict: Response with the MessageId
+        """
+        data = RawMessage['Data']
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        
+        params = [
+            ('Action', 'SendRawEmail'),
+            ('Version', self.API_VERSION),
+            ('Source', Source)
+        ]
+        params.extend((f'Destinations.member.{i}', destination) for i, destination in enumerate(Destinations, 1))
+        
+        # The message is by far the largest field; base64 output only needs
+        # '+', '/' and '=' escaped, which bytes.replace does without going
+        # through urllib's per-character quoting.
+        buffer = io.BytesIO()
+        buffer.write(urllib.parse.urlencode(params).encode('ascii'))
+        buffer.write(b'&RawMessage.Data=')
+        buffer.write(base64.b64encode(data).replace(b'+', b'%2B').replace(b'/', b'%2F').replace(b'=', b'%3D'))
+        body = buffer.getvalue()
+        
+        for attempt in range(1, SES_MAX_RETRIES + 1):
+            try:
+                return self._send_once(body)
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'Throttling' or attempt == SES_MAX_RETRIES:
+                    raise
+                time.sleep(random.uniform(0, min(20.0, 0.5 * 2 ** attempt)))
+    
+    def _send_once(self, body):
+        """
+        Make one SendRawEmail call and parse its response
+        
+        Args:
+            body (bytes): Form-encoded request body
+            
+        Returns:
+            dict: Response with the MessageId
+        """
+        status, response_body = self._post(body)
+        try:
+            root = ElementTree.fromstring(response_body)
+        except ElementTree.ParseError:
+            # Load balancers may answer 5xx errors with a non-XML body
+            root = ElementTree.Element('Response')
+        if status != 200:
+            raise ClientError({
+                'Error': {
+                    'Code': root.findtext('.//{*}Code', str(status)),
+                    'Message': root.findtext('.//{*}Message', '')
+                },
+                'ResponseMetadata': {'HTTPStatusCode': status}
+            }, 'SendRawEmail')
+        
+        return {
+            'MessageId': root.findtext('.//{*}MessageId'),
+            'ResponseMetadata': {
+                'RequestId': root.findtext('.//{*}RequestId'),
+                'HTTPStatusCode': status
+            }
+        }
+    
+    def _post(self, body):
+        """
+        POST a signed request over this thread's kept-alive connection
+        
+        An idle connection that SES has closed is detected before it is
+        reused and replaced, and a failure while writing the request is
+        retried once on a fresh connection. Once the request has been sent
+        SES may already have accepted the email, so errors reading the
+        response are not retried rather than risking a duplicate send.
+        
+        Args:
+            body (bytes): Form-encoded request body
+            
+        Returns:
+            tuple: HTTP status code and response body
+            
+        Raises:
+            EndpointConnectionError: If the request could not be sent
+            ConnectionClosedError: If the response could not be read
+        """
+        import http.client
+        
+        endpoint_url = f'https://{self.host}/'
+        headers = self._sign(body)
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is not None and _connection_dropped(connection):
+                connection.close()
+                connection = None
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPSConnection(self.host, timeout=10)
+            try:
+                connection.request('POST', '/', body=body, headers=headers)
+                break
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise EndpointConnectionError(endpoint_url=endpoint_url, error=e) from e
+        
+        try:
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError) as e:
+            connection.close()
+            self._local.connection = None
+            raise ConnectionClosedError(endpoint_url=endpoint_url) from e
+    
+    def _sign(self, body):
+        """
+        Build the SigV4 signed headers for a request body
+        
+        Args:
+            body (bytes): Form-encoded request body
+            
+        Returns:
+            dict: HTTP headers including Authorization
+        """
+        credentials = self.credentials.get_frozen_credentials()
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        date_stamp = now.strftime('%Y%m%d')
+        
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded; charset=utf-8',
+            'Host': self.host,
+            'X-Amz-Date': amz_date
+        }
+        if credentials.token:
+            headers['X-Amz-Security-Token'] = credentials.token
+        
+        signed_headers = ';'.join(sorted(name.lower() for name in headers))
+        canonical_headers = ''.join(f'{name.lower()}:{value}\n' for name, value in sorted(headers.items(), key=lambda item: item[0].lower()))
+        canonical_request = '\n'.join([
+            'POST', '/', '', canonical_headers, signed_headers, hashlib.sha256(body).hexdigest()
+        ])
+        
+        scope = f'{date_stamp}/{self.region_name}/{self.SERVICE}/aws4_request'
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+        ])
+        
+        key = ('AWS4' + credentials.secret_key).encode('utf-8')
+        for part in (date_stamp, self.region_name, self.SERVICE, 'aws4_request'):
+            key = hmac.new(key, part.encode('utf-8'), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+        
+        headers['Authorization'] = (
+            f'AWS4-HMAC-SHA256 Credential={credentials.access_key}/{scope}, '
+            f'SignedHeaders={signed_headers}, Signature={signature}'
+        )
+        return headers
+
+@dataclass(frozen=True, slots=True)
+class PreparedBody:
+    """
+    Message body encoded once, ready to drop into a MIME part
+    
+    Attributes:
+        b64_lines (bytes): UTF-8 body, base64 encoded and folded to 76 columns
+    """
+    b64_lines: bytes
+
+@dataclass(frozen=True, slots=True)
+class PreparedMessage:
+    """
+    Subject and bodies of an email, encoded once for repeated raw sends
+    
+    Attributes:
+        subject_bytes (bytes): Subject header value, RFC 2047 encoded if needed
+        html_bytes (bytes): HTML body, base64 encoded and folded to 76 columns
+        text_bytes (bytes, optional): Plain text body, encoded like html_bytes
+    """
+    subject_bytes: bytes
+    html_bytes: bytes
+    text_bytes: bytes | None = None
+
+    @classmethod
+    def from_content(cls, subject, html_content, text_content=None):
+        """
+        Encode email content for use with AWSEmailSender.send_prepared
+        
+        Args:
+            subject (str): Email subject
+            html_content (str): HTML content of the email
+            text_content (str, optional): Plain text content of the email
+            
+        Returns:
+            PreparedMessage: Encoded message content
+        """
+        return cls(
+            subject_bytes=_encode_subject(subject).encode('ascii'),
+            html_bytes=_prepare_body(html_content).b64_lines,
+            text_bytes=_prepare_body(text_content).b64_lines if text_content else None
+        )
+
+# Raw message bytes around the To: header, which is the only per-send part
+PreparedRaw = namedtuple('PreparedRaw', 'prefix_before_to, suffix_after_to')
+
+def _connection_dropped(connection):
+    """
+    Check whether the peer has closed an idle HTTP connection
+    
+    An idle kept-alive socket should have nothing to read; if it is readable
+    the server has sent EOF (or a TLS close) and the socket cannot be reused.
+    
+    Args:
+        connection (http.client.HTTPConnection): Connection to check
+        
+    Returns:
+        bool: True if the connection must not be reused
+    """
+    if connection.sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([connection.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+def _encode_base64_lines(data):
+    """
+    Base64-encode data, folded into 76 character CRLF lines
+    
+    Args:
+        data (bytes): Data to encode
+        
+    Returns:
+        bytes: Folded base64 body
+    """
+    encoded = base64.b64encode(data)
+    return b'\r\n'.join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+
+def _check_header_value(value):
+    """
+    Reject a header value that would break out of its header line
+    
+    Args:
+        value (str): Header value
+        
+    Raises:
+        ValueError: If the value contains a CR or LF
+    """
+    if '\r' in value or '\n' in value:
+        raise ValueError(f"Header value contains a line break: {value!r}")
+
+def _encode_subject(subject):
+    """
+    Encode a subject as a header value folded to 78 columns
+    
+    Short ASCII subjects are used as-is, long ones are folded at spaces, and
+    anything else (non-ASCII, or ASCII that cannot be folded) is written as
+    RFC 2047 encoded words.
+    
+    Args:
+        subject (str): Email subject
+        
+    Returns:
+        str: Subject header value safe to write into a raw message
+    """
+    _check_header_value(subject)
+    if subject.isascii() and len('Subject: ' + subject) <= 78:
+        return subject
+    
+    from email.header import Header
+    if subject.isascii():
+        folded = Header(subject, 'us-ascii', header_name='Subject').encode(linesep='\r\n')
+        if all(len(line) <= 78 for line in folded.split('\r\n')):
+            return folded
+    return Header(subject, 'utf-8', header_name='Subject').encode(linesep='\r\n')
+
+@functools.lru_cache(maxsize=32)
+def _prepare_body(content):
+    """
+    Return the PreparedBody for a body, cached across messages
+    
+    Keyed on the body alone, so messages that share a large HTML body but
+    differ in subject still encode it only once.
+    
+    Args:
+        content (str): Body text
+        
+    Returns:
+        PreparedBody: Encoded body
+    """
+    return PreparedBody(b64_lines=_encode_base64_lines(content.encode('utf-8')))
+
+@functools.lru_cache(maxsize=32)
+def _prepare_message(subject, html_content, text_content):
+    """
+    Return the PreparedMessage for some content, cached across sends
+    
+    Args:
+        subject (str): Email subject
+        html_content (str): HTML content of the email
+        text_content (str, optional): Plain text content of the email
+        
+    Returns:
+        PreparedMessage: Encoded message content
+    """
+    return PreparedMessage.from_content(subject, html_content, text_content)
+
+@functools.lru_cache(maxsize=32)
+def _render_alternative(prepared):
+    """
+    Serialize the multipart/alternative entity holding the message bodies
+    
+    The MIME envelope is written directly instead of going through
+    email.generator; both parts are UTF-8 and already base64 encoded. The
+    boundary is fixed per prepared message, so the entity is built once and
+    shared by every send of the same content.
+    
+    Args:
+        prepared (PreparedMessage): Pre-encoded message content
+        
+    Returns:
+        bytes: Content-Type header, blank line and multipart body
+    """
+    boundary = ('=_Boundary_' + secrets.token_hex(8)).encode('ascii')
+    
+    buffer = io.BytesIO()
+    buffer.write(b'Content-Type: multipart/alternative; boundary="')
+    buffer.write(boundary)
+    buffer.write(b'"\r\n\r\n')
+    
+    # Add text content if provided
+    if prepared.text_bytes:
+        buffer.write(b'--' + boundary + b'\r\n')
+        buffer.write(b'Content-Type: text/plain; charset=UTF-8\r\n')
+        buffer.write(b'Content-Transfer-Encoding: base64\r\n\r\n')
+        buffer.write(prepared.text_bytes)
+        buffer.write(b'\r\n')
+    
+    # Add HTML content
+    buffer.write(b'--' + boundary + b'\r\n')
+    buffer.write(b'Content-Type: text/html; charset=UTF-8\r\n')
+    buffer.write(b'Content-Transfer-Encoding: base64\r\n\r\n')
+    buffer.write(prepared.html_bytes)
+    buffer.write(b'\r\n--' + boundary + b'--\r\n')
+    
+    return buffer.getvalue()
+
+@functools.lru_cache(maxsize=32)
+def _prepare_raw(sender_email, prepared):
+    """
+    Serialize everything in a raw message except the To: header
+    
+    Args:
+        sender_email (str): Sender email address
+        prepared (PreparedMessage): Pre-encoded message content
+        
+    Returns:
+        PreparedRaw: Message bytes before and after the To: header
+    """
+    return PreparedRaw(
+        prefix_before_to=b'From: ' + sender_email.encode('utf-8') + b'\r\n',
+        suffix_after_to=b''.join((
+            b'Subject: ', prepared.subject_bytes, b'\r\n',
+            b'MIME-Version: 1.0\r\n',
+            _render_alternative(prepared)
+        ))
+    )
+
+# MIME type/subtype as restricted by RFC 6838
+_CONTENT_TYPE_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9!#$&^_.+-]*/[A-Za-z0-9][A-Za-z0-9!#$&^_.+-]*")
+
+def _attachment_params(filename):
+    """
+    Build the name/filename parameters for an attachment's headers
+    
+    Args:
+        filename (str): Attachment file name
+        
+    Returns:
+        tuple: Content-Type name and Content-Disposition filename parameters
+    """
+    if all(' ' <= char <= '~' for char in filename):
+        quoted = filename.replace('\\', '\\\\').replace('"', '\\"')
+        return f'name="{quoted}"', f'filename="{quoted}"'
+    
+    # RFC 2231 encoding for non-ASCII file names and control characters,
+    # which percent-encodes line breaks instead of writing them out
+    encoded = "utf-8''" + urllib.parse.quote(filename, safe='')
+    return f'name*={encoded}', f'filename*={encoded}'
+
+def _build_raw_message(sender_email, recipient_emails, prepared, attachments=None):
+    """
+    Assemble a raw MIME message around prepared content
+    
+    Without attachments this is the cached multipart/alternative message
+    with a To: header added. Attachments wrap it in multipart/mixed.
+    
+    Args:
+        sender_email (str): Sender email address
+        recipient_emails (list): List of recipient email addresses
+        prepared (PreparedMessage): Pre-encoded message content
+        attachments (list, optional): List of (filename, data, content_type)
+            tuples, where data is bytes
+        
+    Returns:
+        bytes: Serialized MIME message
+    
+    Raises:
+        ValueError: If an address contains a CR or LF, or an attachment
+            content type is not a valid type/subtype
+    """
+    _check_header_value(sender_email)
+    for recipient in recipient_emails:
+        _check_header_value(recipient)
+    to_header = b',\r\n '.join(recipient.encode('utf-8') for recipient in recipient_emails)
+    
+    if not attachments:
+        prepared_raw = _prepare_raw(sender_email, prepared)
+        return b''.join((
+            prepared_raw.prefix_before_to,
+            b'To: ', to_header, b'\r\n',
+            prepared_raw.suffix_after_to
+        ))
+    
+    boundary = ('=_Mixed_' + secrets.token_hex(8)).encode('ascii')
+    
+    buffer = io.BytesIO()
+    buffer.write(b'From: ' + sender_email.encode('utf-8') + b'\r\n')
+    buffer.write(b'To: ' + to_header + b'\r\n')
+    buffer.write(b'Subject: ' + prepared.subject_bytes + b'\r\n')
+    buffer.write(b'MIME-Version: 1.0\r\n')
+    buffer.write(b'Content-Type: multipart/mixed; boundary="' + boundary + b'"\r\n\r\n')
+    
+    # Message bodies first, then each attachment
+    buffer.write(b'--' + boundary + b'\r\n')
+    buffer.write(_render_alternative(prepared))
+    for filename, data, content_type in attachments:
+        if not _CONTENT_TYPE_PATTERN.fullmatch(content_type):
+            raise ValueError(f"Invalid attachment content type: {content_type!r}")
+        name_param, filename_param = _attachment_params(filename)
+        buffer.write(b'--' + boundary + b'\r\n')
+        buffer.write(f'Content-Type: {content_type}; {name_param}\r\n'.encode('ascii'))
+        buffer.write(f'Content-Disposition: attachment; {filename_param}\r\n'.encode('ascii'))
+        buffer.write(b'Content-Transfer-Encoding: base64\r\n\r\n')
+        buffer.write(_encode_base64_lines(data))
+        buffer.write(b'\r\n')
+    buffer.write(b'--' + boundary + b'--\r\n')
+    
+    return buffer.getvalue()
+
+class CompiledTemplate:
+    """
+    HTML template with {{placeholder}} slots, split once for fast rendering
+    
+    Slots use the same handlebars syntax as SES templates (see send_bulk),
+    so one template file works with both. The template is split into
+    literal chunks and slot names up front, so personalizing it per
+    recipient is a single join over the chunks rather than a scan of the
+    whole HTML. Single braces (such as CSS rule bodies) are literal text.
+    """
+    __slots__ = ('parts', 'slots')
+    
+    _SLOT_PATTERN = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+    def __init__(self, html_content):
+        """
+        Compile an HTML template
+        
+        Args:
+            html_content (str): HTML with {{placeholder}} slots
+        """
+        # Even indices are literal chunks, odd indices are slot names
+        self.parts = tuple(self._SLOT_PATTERN.split(html_content))
+        self.slots = frozenset(self.parts[1::2])
+    
+    def render(self, values, escape=True, converters=None):
+        """
+        Fill in the slots for one recipient
+        
+        Values are treated as HTML text: they are converted with str() and
+        HTML-escaped, which does not make them safe inside a URL. For a slot
+        in a link (such as the email-viewer query string in template.html),
+        pass a converter like urllib.parse.quote for it.
+        
+        Args:
+            values (dict): Value for every slot name
+            escape (bool): HTML-escape the converted values; pass False only
+                for trusted values that are already HTML (default: True)
+            converters (dict, optional): Slot name to a callable that turns
+                the value into a string, used instead of str()
+            
+        Returns:
+            str: Rendered HTML content
+        """
+        converters = converters or {}
+        
+        def convert(name):
+            text = converters.get(name, str)(values[name])
+            return html.escape(text) if escape else text
+        
+        return ''.join(part if i % 2 == 0 else convert(part) for i, part in enumerate(self.parts))
+
+@functools.lru_cache(maxsize=32)
+def _compile_template(html_content):
+    """
+    Compile template HTML; cached per content
+    
+    load_html_template returns the same string until the file changes, so
+    lookups for an unchanged template hit the cache.
+    
+    Args:
+        html_content (str): HTML with {{placeholder}} slots
+        
+    Returns:
+        CompiledTemplate: Compiled template
+    """
+    return CompiledTemplate(html_content)
+
+@functools.lru_cache(maxsize=32)
+def _read_template(template_path, mtime_ns):
+    """
+    Read a template file; cached per (path, modification time)
+    
+    Args:
+        template_path (str): Path to HTML template file
+        mtime_ns (int): File modification time, part of the cache key only
+        
+    Returns:
+        str: HTML content
+    """
+    with open(template_path, 'r', encoding='utf-8') as file:
+        return file.read()
+
 def load_html_template(template_path):
     """
     Load HTML template from file
     
+    The file is read once and served from memory until it changes on disk.
+    
     Args:
         template_path (str): Path to HTML template file
         
@@ -173,21 +1122,38 @@ def load_html_template(template_path):
         str: HTML content
     """
     try:
-        with open(template_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        return _read_template(template_path, os.stat(template_path).st_mtime_ns)
     except FileNotFoundError:
-        print(f"Template file not found: {template_path}")
+        log.warning("Template file not found: %s", template_path)
         return None
     except Exception as e:
-        print(f"Error reading template file: {e}")
+        log.warning("Error reading template file: %s", e)
         return None
 
+def load_compiled_template(template_path):
+    """
+    Load an HTML template from file and compile its {{placeholder}} slots
+    
+    The compiled template is reused until the file changes on disk.
+    
+    Args:
+        template_path (str): Path to HTML template file
+        
+    Returns:
+        CompiledTemplate: Compiled template
+    """
+    html_content = load_html_template(template_path)
+    if html_content is None:
+        return None
+    return _compile_template(html_content)
+
 def main():
     """
     Main function to send email using AWS SES
     """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    
     # Configuration
-    AWS_REGION = 'us-east-1'  # Change to your preferred region
     SENDER_EMAIL = 'your-verified-email@example.com'  # Must be verified in AWS SES
     RECIPIENT_EMAILS = [
         'olgamikhalenka97@gmail.com',
@@ -236,7 +1202,7 @@ def main():
         print(f"Message ID: {response['MessageId']}")
         
         # Print quota information
-        quota_info = email_sender.get_send_quota()
+        quota_info = email_sender.get_send_quota(refresh=True)
         if quota_info:
             print(f"\nSending Quota Information:")
             print(f"Max 24 Hour Send: {quota_info['Max24HourSend']}")
@@ -248,12 +1214,14 @@ def main():
 if __name__ == "__main__":
     # Check if AWS credentials are configured
     try:
-        # Test AWS credentials
-        sts_client = boto3.client('sts')
-        identity = sts_client.get_caller_identity()
-        print(f"AWS Account: {identity['Account']}")
-        print(f"AWS User/Role: {identity['Arn']}")
-        print(f"AWS Region: {identity['Account']}")
+        # Test AWS credentials (set SKIP_AWS_IDENTITY_CHECK=1 to skip the
+        # STS round-trip, e.g. in development loops)
+        if not os.environ.get('SKIP_AWS_IDENTITY_CHECK'):
+            sts_client = AWSEmailSender._get_session().client('sts')
+            identity = sts_client.get_caller_identity()
+            print(f"AWS Account: {identity['Account']}")
+            print(f"AWS User/Role: {identity['Arn']}")
+            print(f"AWS Region: {AWS_REGION}")
         
         # Run main function
         main()
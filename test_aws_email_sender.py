@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Tests for aws_email_sender
+"""
+
+import os
+import email
+import email.policy
+import socket
+import threading
+import unittest
+import http.client
+import urllib.parse
+from datetime import datetime, timezone
+from unittest import mock
+
+from botocore.credentials import Credentials
+from botocore.exceptions import ClientError, ConnectionClosedError
+
+import aws_email_sender
+
+ACCESS_KEY = 'AKIDEXAMPLE'
+SECRET_KEY = 'wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY'
+BODY = b'Action=SendRawEmail&Source=sender%40example.com'
+SIGNED_AT = datetime(2015, 8, 30, 12, 36, 0, tzinfo=timezone.utc)
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return SIGNED_AT
+
+
+class SigV4SignatureTest(unittest.TestCase):
+    # Expected values were produced by botocore's SigV4Auth for the same
+    # request, credentials and timestamp
+
+    def sign(self, token=None):
+        client = aws_email_sender.SESQueryClient('us-east-1', Credentials(ACCESS_KEY, SECRET_KEY, token))
+        with mock.patch.object(aws_email_sender, 'datetime', FixedDatetime):
+            return client._sign(BODY)
+
+    def test_signature_without_session_token(self):
+        headers = self.sign()
+        self.assertEqual(headers['X-Amz-Date'], '20150830T123600Z')
+        self.assertEqual(
+            headers['Authorization'],
+            'AWS4-HMAC-SHA256 Credential=AKIDEXAMPLE/20150830/us-east-1/ses/aws4_request, '
+            'SignedHeaders=content-type;host;x-amz-date, '
+            'Signature=c12f7a0c6eb56f1a2a240c351ba6da6a63d9586a739670c962127f50c9c54fce'
+        )
+
+    def test_signature_with_session_token(self):
+        headers = self.sign(token='session-token')
+        self.assertEqual(headers['X-Amz-Security-Token'], 'session-token')
+        self.assertEqual(
+            headers['Authorization'],
+            'AWS4-HMAC-SHA256 Credential=AKIDEXAMPLE/20150830/us-east-1/ses/aws4_request, '
+            'SignedHeaders=content-type;host;x-amz-date;x-amz-security-token, '
+            'Signature=b24928f6c9071040a480cbd9f15e7393221f30e3484899e9f4c655b76286132e'
+        )
+
+
+class RawMessageTest(unittest.TestCase):
+    SENDER = 'sender@example.com'
+    RECIPIENTS = ['first@example.com', 'second@example.com']
+
+    def prepared(self, subject='Subject', text_content='Plain text'):
+        return aws_email_sender.PreparedMessage.from_content(subject, '<p>Hello</p>', text_content)
+
+    def parse(self, raw_message):
+        return email.message_from_bytes(raw_message, policy=email.policy.default)
+
+    def test_line_breaks_in_headers_are_rejected(self):
+        for value in ['a@example.com\r\nBcc: evil@example.com', 'a@example.com\nBcc: evil@example.com']:
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    aws_email_sender._check_header_value(value)
+                with self.assertRaises(ValueError):
+                    aws_email_sender._build_raw_message(value, self.RECIPIENTS, self.prepared())
+                with self.assertRaises(ValueError):
+                    aws_email_sender._build_raw_message(self.SENDER, [value], self.prepared())
+                with self.assertRaises(ValueError):
+                    self.prepared(subject='Hi' + value[13:])
+
+    def test_long_ascii_subject_is_folded(self):
+        for subject in ['word ' * 240, 'x' * 1200]:
+            with self.subTest(subject=subject[:10]):
+                encoded = aws_email_sender._encode_subject(subject)
+                lines = ('Subject: ' + encoded).split('\r\n')
+                self.assertGreater(len(lines), 1)
+                self.assertTrue(all(len(line) <= 78 for line in lines))
+                raw_message = aws_email_sender._build_raw_message(self.SENDER, self.RECIPIENTS, self.prepared(subject))
+                self.assertEqual(str(self.parse(raw_message)['Subject']), subject)
+
+    def test_non_ascii_subject_is_rfc2047_encoded(self):
+        subject = 'Preqin Updates – Über ' * 5
+        encoded = aws_email_sender._encode_subject(subject)
+        self.assertTrue(encoded.isascii())
+        self.assertTrue(encoded.startswith('=?utf-8?b?'))
+        raw_message = aws_email_sender._build_raw_message(self.SENDER, self.RECIPIENTS, self.prepared(subject))
+        self.assertEqual(str(self.parse(raw_message)['Subject']), subject)
+
+    def test_message_without_attachments_parses(self):
+        raw_message = aws_email_sender._build_raw_message(self.SENDER, self.RECIPIENTS, self.prepared())
+        message = self.parse(raw_message)
+        self.assertEqual(message['From'], self.SENDER)
+        self.assertEqual([address.addr_spec for address in message['To'].addresses], self.RECIPIENTS)
+        self.assertEqual(message.get_content_type(), 'multipart/alternative')
+        self.assertEqual(message.get_body(('plain',)).get_content(), 'Plain text')
+        self.assertEqual(message.get_body(('html',)).get_content(), '<p>Hello</p>')
+        self.assertTrue(all(len(line) <= 78 for line in raw_message.split(b'\r\n')))
+
+    def test_message_with_attachments_parses(self):
+        attachments = [
+            ('report.pdf', b'%PDF-1.4 \x00\xff', 'application/pdf'),
+            ('отчёт.csv', b'a,b\n1,2\n', 'text/csv')
+        ]
+        raw_message = aws_email_sender._build_raw_message(self.SENDER, self.RECIPIENTS, self.prepared(), attachments)
+        message = self.parse(raw_message)
+        self.assertEqual(message.get_content_type(), 'multipart/mixed')
+        self.assertEqual(message.get_body(('html',)).get_content(), '<p>Hello</p>')
+        parsed = [(part.get_filename(), part.get_content(), part.get_content_type())
+                  for part in message.iter_attachments()]
+        self.assertEqual(parsed, [
+            ('report.pdf', b'%PDF-1.4 \x00\xff', 'application/pdf'),
+            ('отчёт.csv', 'a,b\n1,2\n', 'text/csv')
+        ])
+
+    def test_malicious_attachment_name_stays_in_its_parameter(self):
+        for filename in ['a\r\nX-Evil: y.txt', 'tab\there.txt', 'bell\x07.txt']:
+            with self.subTest(filename=filename):
+                name_param, filename_param = aws_email_sender._attachment_params(filename)
+                self.assertTrue(name_param.startswith("name*=utf-8''"))
+                self.assertTrue(filename_param.isprintable())
+                self.assertNotIn('\n', name_param + filename_param)
+
+                raw_message = aws_email_sender._build_raw_message(
+                    self.SENDER, self.RECIPIENTS, self.prepared(), [(filename, b'data', 'text/plain')]
+                )
+                self.assertNotIn(b'\r\nX-Evil', raw_message)
+                attachment = next(self.parse(raw_message).iter_attachments())
+                self.assertEqual(attachment.get_filename(), filename)
+
+    def test_quoted_attachment_name_is_escaped(self):
+        self.assertEqual(
+            aws_email_sender._attachment_params('say "hi"\\.txt'),
+            ('name="say \\"hi\\"\\\\.txt"', 'filename="say \\"hi\\"\\\\.txt"')
+        )
+
+    def test_invalid_content_types_are_rejected(self):
+        for content_type in ['text/plain\r\nX-Evil: y', 'text/plain; charset=utf-8', 'téxt/plain', 'plain', '']:
+            with self.subTest(content_type=content_type):
+                self.assertIsNone(aws_email_sender._CONTENT_TYPE_PATTERN.fullmatch(content_type))
+                with self.assertRaises(ValueError):
+                    aws_email_sender._build_raw_message(
+                        self.SENDER, self.RECIPIENTS, self.prepared(), [('file.txt', b'data', content_type)]
+                    )
+        self.assertIsNotNone(aws_email_sender._CONTENT_TYPE_PATTERN.fullmatch('application/vnd.ms-excel'))
+
+
+class QueryClientRetryTest(unittest.TestCase):
+    THROTTLED = (400, b'<ErrorResponse><Error><Code>Throttling</Code>'
+                      b'<Message>Maximum sending rate exceeded.</Message></Error></ErrorResponse>')
+    REJECTED = (400, b'<ErrorResponse><Error><Code>MessageRejected</Code>'
+                     b'<Message>Email address is not verified.</Message></Error></ErrorResponse>')
+    SENT = (200, b'<SendRawEmailResponse><SendRawEmailResult><MessageId>message-1</MessageId>'
+                 b'</SendRawEmailResult></SendRawEmailResponse>')
+
+    def send(self, responses):
+        client = aws_email_sender.SESQueryClient('us-east-1', Credentials(ACCESS_KEY, SECRET_KEY))
+        with mock.patch.object(client, '_post', side_effect=responses) as post, \
+                mock.patch.object(aws_email_sender.time, 'sleep'):
+            try:
+                return client.send_raw_email(
+                    Source='sender@example.com',
+                    Destinations=['recipient@example.com'],
+                    RawMessage={'Data': b'raw message'}
+                )
+            finally:
+                self.post_calls = post.call_count
+
+    def test_throttling_is_retried(self):
+        response = self.send([self.THROTTLED, self.THROTTLED, self.SENT])
+        self.assertEqual(response['MessageId'], 'message-1')
+        self.assertEqual(self.post_calls, 3)
+
+    def test_throttling_gives_up_after_max_retries(self):
+        with self.assertRaises(ClientError):
+            self.send([self.THROTTLED] * aws_email_sender.SES_MAX_RETRIES)
+        self.assertEqual(self.post_calls, aws_email_sender.SES_MAX_RETRIES)
+
+    def test_other_errors_are_not_retried(self):
+        with self.assertRaises(ClientError):
+            self.send([self.REJECTED, self.SENT])
+        self.assertEqual(self.post_calls, 1)
+
+
+class QueryClientConnectionTest(unittest.TestCase):
+
+    def make_connection(self, sock):
+        connection = mock.Mock()
+        connection.sock = sock
+        return connection
+
+    def test_idle_connection_is_reused(self):
+        local, remote = socket.socketpair()
+        self.addCleanup(local.close)
+        self.addCleanup(remote.close)
+        self.assertFalse(aws_email_sender._connection_dropped(self.make_connection(local)))
+
+    def test_connection_closed_by_peer_is_detected(self):
+        local, remote = socket.socketpair()
+        self.addCleanup(local.close)
+        remote.close()
+        self.assertTrue(aws_email_sender._connection_dropped(self.make_connection(local)))
+
+    def test_dropped_connection_is_replaced_before_sending(self):
+        client = aws_email_sender.SESQueryClient('us-east-1', Credentials(ACCESS_KEY, SECRET_KEY))
+        stale = mock.Mock()
+        client._local.connection = stale
+        fresh = mock.Mock()
+        fresh.getresponse.return_value.status = 200
+        fresh.getresponse.return_value.read.return_value = b'<r/>'
+        with mock.patch.object(aws_email_sender, '_connection_dropped', return_value=True), \
+                mock.patch.object(http.client, 'HTTPSConnection', return_value=fresh):
+            self.assertEqual(client._post(BODY), (200, b'<r/>'))
+        stale.close.assert_called_once()
+        stale.request.assert_not_called()
+        fresh.request.assert_called_once()
+
+    def test_lost_response_is_not_retried_and_send_fails_cleanly(self):
+        client = aws_email_sender.SESQueryClient('us-east-1', Credentials(ACCESS_KEY, SECRET_KEY))
+        connection = mock.Mock()
+        connection.getresponse.side_effect = http.client.RemoteDisconnected('closed')
+        with mock.patch.object(http.client, 'HTTPSConnection', return_value=connection):
+            with self.assertRaises(ConnectionClosedError):
+                client._post(BODY)
+            connection.request.assert_called_once()
+
+            sender = aws_email_sender.AWSEmailSender('us-east-1')
+            sender.raw_client = client
+            with mock.patch.object(aws_email_sender.AWSEmailSender, '_wait_for_send_slot'), \
+                    self.assertLogs(aws_email_sender.log, 'WARNING'):
+                response = sender.send_prepared(
+                    'sender@example.com', ['recipient@example.com'],
+                    aws_email_sender.PreparedMessage.from_content('Subject', '<p>Hi</p>')
+                )
+        self.assertIsNone(response)
+
+
+class ClientCacheTest(unittest.TestCase):
+
+    def test_concurrent_first_senders_build_one_client(self):
+        session = mock.Mock()
+
+        def build_client(*args, **kwargs):
+            # Widen the window in which an unguarded check-then-create races
+            threading.Event().wait(0.01)
+            return mock.Mock()
+        session.client.side_effect = build_client
+
+        region = 'ap-south-2'
+        barrier = threading.Barrier(8)
+        senders = []
+
+        def create_sender():
+            barrier.wait()
+            senders.append(aws_email_sender.AWSEmailSender(region))
+
+        with mock.patch.object(aws_email_sender.AWSEmailSender, '_session', session), \
+                mock.patch.dict(aws_email_sender.AWSEmailSender._client_cache):
+            threads = [threading.Thread(target=create_sender) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(session.client.call_count, 1)
+        self.assertEqual(len({id(sender.ses_client) for sender in senders}), 1)
+
+
+class SendRateLimiterTest(unittest.TestCase):
+
+    def test_senders_in_a_region_share_one_bucket(self):
+        first = aws_email_sender.AWSEmailSender('eu-west-2')
+        second = aws_email_sender.AWSEmailSender('eu-west-2')
+        other = aws_email_sender.AWSEmailSender('eu-west-3')
+        self.assertIs(first._rate_limiter, second._rate_limiter)
+        self.assertIsNot(first._rate_limiter, other._rate_limiter)
+
+    def test_bucket_limits_combined_sends(self):
+        limiter = aws_email_sender._SendRateLimiter()
+        get_send_quota = mock.Mock(return_value={'MaxSendRate': 2.0})
+        with mock.patch.object(aws_email_sender.time, 'sleep') as sleep:
+            limiter.acquire(1, get_send_quota)
+            limiter.acquire(1, get_send_quota)
+            sleep.assert_not_called()
+            limiter.acquire(1, get_send_quota)
+            sleep.assert_called_once()
+        get_send_quota.assert_called_once()
+
+    def test_failed_rate_lookup_is_retried(self):
+        limiter = aws_email_sender._SendRateLimiter()
+        get_send_quota = mock.Mock(side_effect=[None, {'MaxSendRate': 14.0}])
+        with mock.patch.object(aws_email_sender.time, 'monotonic', return_value=100.0):
+            limiter.acquire(1, get_send_quota)
+            limiter.acquire(1, get_send_quota)
+        self.assertIsNone(limiter.rate)
+        self.assertEqual(get_send_quota.call_count, 1)
+
+        retry_at = 100.0 + aws_email_sender.SEND_QUOTA_RETRY_DELAY
+        with mock.patch.object(aws_email_sender.time, 'monotonic', return_value=retry_at):
+            limiter.acquire(1, get_send_quota)
+        self.assertEqual(limiter.rate, 14.0)
+        self.assertEqual(get_send_quota.call_count, 2)
+
+
+class SendQuotaCacheTest(unittest.TestCase):
+    QUOTA = {'Max24HourSend': 50000.0, 'MaxSendRate': 14.0, 'SentLast24Hours': 12.0}
+
+    def setUp(self):
+        self.sender = aws_email_sender.AWSEmailSender('eu-west-2')
+        self.sender.ses_client = mock.Mock()
+        self.sender.ses_client.get_send_quota.return_value = self.QUOTA
+        self.get_send_quota = self.sender.ses_client.get_send_quota
+
+    def test_second_call_within_ttl_uses_cache(self):
+        self.assertEqual(self.sender.get_send_quota(), self.QUOTA)
+        self.assertEqual(self.sender.get_send_quota(), self.QUOTA)
+        self.get_send_quota.assert_called_once_with()
+
+    def test_cache_expires_after_ttl(self):
+        with mock.patch.object(aws_email_sender.time, 'monotonic', return_value=100.0):
+            self.sender.get_send_quota()
+        with mock.patch.object(aws_email_sender.time, 'monotonic',
+                               return_value=100.0 + aws_email_sender.SEND_QUOTA_TTL):
+            self.sender.get_send_quota()
+        self.assertEqual(self.get_send_quota.call_count, 2)
+
+    def test_refresh_bypasses_cache(self):
+        self.sender.get_send_quota()
+        self.sender.get_send_quota(refresh=True)
+        self.assertEqual(self.get_send_quota.call_count, 2)
+
+    def test_failed_call_keeps_cached_quota(self):
+        self.sender.get_send_quota()
+        self.get_send_quota.side_effect = ClientError(
+            {'Error': {'Code': 'Throttling', 'Message': 'Rate exceeded'}}, 'GetSendQuota'
+        )
+        with self.assertLogs(aws_email_sender.log, 'WARNING'):
+            self.assertIsNone(self.sender.get_send_quota(refresh=True))
+        self.assertEqual(self.sender.get_send_quota(), self.QUOTA)
+        self.assertEqual(self.get_send_quota.call_count, 2)
+
+
+class CompiledTemplateTest(unittest.TestCase):
+    TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template.html')
+    VIEWER_LINK = 'https://preqin.com/email-viewer?email={email_id}&date={email_date}'
+
+    def test_renders_handlebars_slots_in_repo_template(self):
+        template = aws_email_sender.load_compiled_template(self.TEMPLATE_PATH)
+        self.assertEqual(template.slots, {'email_id', 'email_date'})
+
+        rendered = template.render({'email_id': '42', 'email_date': '2026-10-15'})
+        self.assertIn(self.VIEWER_LINK.format(email_id='42', email_date='2026-10-15'), rendered)
+        self.assertNotIn('{{', rendered)
+
+    def test_single_braces_are_literal(self):
+        template = aws_email_sender.CompiledTemplate('p { color: red; } {name} {{ name }}')
+        self.assertEqual(template.render({'name': 'Ann'}), 'p { color: red; } {name} Ann')
+
+    def test_values_are_html_escaped(self):
+        template = aws_email_sender.CompiledTemplate('<p>{{name}}</p>')
+        self.assertEqual(template.render({'name': '<b>&'}), '<p>&lt;b&gt;&amp;</p>')
+        self.assertEqual(template.render({'name': '<b>'}, escape=False), '<p><b></p>')
+
+    def test_converter_url_encodes_link_slots(self):
+        template = aws_email_sender.load_compiled_template(self.TEMPLATE_PATH)
+        rendered = template.render(
+            {'email_id': 'a b&c#d', 'email_date': '2026-10-15'},
+            converters={'email_id': urllib.parse.quote_plus}
+        )
+        self.assertIn(self.VIEWER_LINK.format(email_id='a+b%26c%23d', email_date='2026-10-15'), rendered)
+
+
+if __name__ == '__main__':
+    unittest.main()